@@ -1,8 +1,5 @@
-import mesa
-import math
-import logging as log
-import numpy as np
 from .random_walker import RandomWalker
+from .state import ACTIVE, OPPOSE, SUPPORT, JAILED, SECURITY, CONDITIONS, CONDITION_CODES, SlotAttribute
 
 
 class Citizen(RandomWalker):
@@ -10,8 +7,38 @@ class Citizen(RandomWalker):
     Citizen agent class that inherits from RandomWalker class. This class
     looks at it's neighbors and decides whether to activate or not based on
     number of active neighbors and it's own activation level.
+
+    Numeric state lives in the model's CitizenState arrays; the attributes
+    below are views onto this citizen's slot.
     """
 
+    # agent personality attributes
+    private_preference = SlotAttribute()
+    epsilon = SlotAttribute()
+    epsilon_probability = SlotAttribute()
+    oppose_threshold = SlotAttribute()
+    active_threshold = SlotAttribute()
+
+    # agent memory attributes
+    flip = SlotAttribute()
+    ever_flipped = SlotAttribute()
+    condition_code = SlotAttribute()
+    update_condition_code = SlotAttribute()
+    actives_in_vision = SlotAttribute()
+    opposed_in_vision = SlotAttribute()
+    support_in_vision = SlotAttribute()
+    security_in_vision = SlotAttribute()
+    active_ratio = SlotAttribute()
+    perception = SlotAttribute()
+    arrest_prob = SlotAttribute()
+    opinion = SlotAttribute()
+    activation = SlotAttribute()
+    active_level = SlotAttribute()
+    oppose_level = SlotAttribute()
+
+    # agent jail attributes
+    jail_sentence = SlotAttribute()
+
     def __init__(
         self,
         unique_id,
@@ -26,15 +53,13 @@ class Citizen(RandomWalker):
     ):
         """
         Attributes and methods inherited from RandomWalker class:
-        grid, x, y, moore, update_neighbors, random_move, determine_avg_loc,
+        grid, x, y, moore, random_move, determine_avg_loc,
         move_towards, sigmoid, logit, distance
         """
+        self.slot = model.citizens.register(self)
         super().__init__(unique_id, model, pos)
         self.vision = vision
 
-        # simultaneous activation attributes
-        self._update_condition = None
-
         # agent personality attributes
         self.private_preference = private_preference
         self.epsilon = epsilon
@@ -43,142 +68,42 @@ class Citizen(RandomWalker):
         self.active_threshold = active_threshold
 
         # agent memory attributes
-        self.flip = None
-        self.ever_flipped = False
-        self.condition = "Support"
-        self.perception = None
-        self.arrest_prob = None
-        self.actives_in_vision = 1
-        self.opposed_in_vision = 0
-        self.support_in_vision = 0
-        self.security_in_vision = 0
-        self.opinion = None
-        self.activation = None
-        self.active_level = None
-        self.oppose_level = None
+        self.condition_code = SUPPORT
 
-        # agent jail attributes
-        self.jail_sentence = 0
+    @property
+    def pos(self):
+        x = self.model.citizens.x[self.slot]
+        if x < 0:
+            return None
+        return (int(x), int(self.model.citizens.y[self.slot]))
 
-    def step(self):
-        """
-        Decide whether to activate, then move if applicable.
-        """
-        # Set flip to False
-        self.flip = False
-
-        if self.jail_sentence > 0 or self.condition == "Jailed":
-            return
-
-        # update neighborhood
-        self.neighborhood = self.update_neighbors()
-        # based on neighborhood determine if support, oppose, or active
-        self.determine_condition()
-
-    def advance(self):
-        """
-        Advance the citizen to the next step of the model.
-        """
-        # jail sentence
-        if self.jail_sentence > 0:
-            self.jail_sentence -= 1
-            return
-        elif self.jail_sentence <= 0 and self.condition == "Jailed":
-            self.pos = self.random.choice(list(self.model.grid.empties))
-            self.model.grid.place_agent(self, self.pos)
-            self.condition = "Support"
+    @pos.setter
+    def pos(self, value):
+        if value is None:
+            value = (-1, -1)
+        self.model.citizens.x[self.slot], self.model.citizens.y[self.slot] = value
 
-        # update condition
-        self.condition = self._update_condition
+    @property
+    def condition(self):
+        return CONDITIONS[self.model.citizens.condition_code[self.slot]]
 
-        # random movement
-        self.random_move()
+    @condition.setter
+    def condition(self, value):
+        self.model.citizens.condition_code[self.slot] = CONDITION_CODES[value]
 
-    def count_neigbhors(self):
+    def step(self):
         """
-        Count the number of neighbors of each type
+        Activation is decided for the whole population at once in
+        ResistanceCascade._step_citizens.
         """
-        # Initialize count variables
-        self.actives_in_vision = 1
-        self.opposed_in_vision = 0
-        self.support_in_vision = 1
-        self.security_in_vision = 0
-
-        # Loop through neighbors and count agent types
-        for active in self.neighbors:
-            if isinstance(active, Citizen):
-                if active.condition == "Active":
-                    self.actives_in_vision += 1
-                elif active.condition == "Oppose":
-                    self.opposed_in_vision += 1
-                elif active.condition == "Support":
-                    self.support_in_vision += 1
-            elif isinstance(active, Security):
-                self.security_in_vision += 1
+        pass
 
-    def determine_condition(self):
+    def advance(self):
         """
-        activation function that determines whether citizen will support
-        or activate.
+        Citizens are advanced for the whole population at once in
+        ResistanceCascade._advance_citizens.
         """
-        # return count of neighbor types
-        self.count_neigbhors()
-
-        # ratio of active and oppose to citizens in vision
-        self.active_ratio = (
-            self.actives_in_vision + self.opposed_in_vision
-        ) / self.support_in_vision
-
-        # perceptions of support/oppose/active
-        self.perception = (
-            self.actives_in_vision + self.opposed_in_vision * self.epsilon_probability
-        ) ** ((self.epsilon**2 + 1) ** -1)
-
-        # Probability of arrest P
-        self.arrest_prob = 1 - np.exp(
-            # constant that produces 0.9 at 1 active (self) and 1 security
-            -2.3
-            # ratio of securtiy to actives where self is active always
-            * (self.security_in_vision / (self.actives_in_vision))
-            # 0 epsilon, ie no error is 0.5 sigmoid probability output
-            # where 2 * epsilon is 1.0, aka 1 * probability, aka perfect estimation
-            * (2 * self.epsilon_probability)
-        )
-
-        # Calculate opinion and determine condition
-        self.opinion = (
-            # flip private preference so negative regime opinion makes citizen
-            # more likely to activate
-            (-1 * self.private_preference)
-            # perception as a function of the inverse of epsilon squared interacted
-            # with the number of actives and opposed in vision
-            + (self.perception * self.active_ratio)
-            # agents expectation of arrest probability as a function of epsilon
-            # interacted with expected cost of arrest interacted with epsilon
-        )
-
-        # uniform random activation 0.0 - 1.0
-        random_activation = self.model.random.uniform(0.0, 1.0)
-
-        # calculate activation levels
-        self.activation = self.model.sigmoid(self.opinion)
-        self.active_level = (
-            self.model.sigmoid(self.opinion - self.active_threshold) - self.arrest_prob
-        )
-        self.oppose_level = (
-            self.model.sigmoid(self.opinion - self.oppose_threshold) - self.arrest_prob
-        )
-
-        # assign condition by activation level
-        if self.active_level > random_activation:
-            if self._update_condition != "Active":
-                self.flip = True
-                self.ever_flipped = True
-            self._update_condition = "Active"
-        elif self.oppose_level > random_activation:
-            self._update_condition = "Oppose"
-        else:
-            self._update_condition = "Support"
+        pass
 
 
 class Security(RandomWalker):
@@ -187,10 +112,14 @@ class Security(RandomWalker):
     looks at it's neighbors and arrests active neighbor
 
     Attributes and methods inherited from RandomWalker class:
-    grid, x, y, moore, update_neighbors, random_move, determine_avg_loc,
+    grid, x, y, moore, random_move, determine_avg_loc,
     move_towards, sigmoid, logit, distance
     """
 
+    # shares the code space with citizen conditions so neighbors can be
+    # told apart without isinstance checks
+    condition_code = SECURITY
+
     def __init__(self, unique_id, model, pos, vision, private_preference):
         super().__init__(unique_id, model, pos)
         self.pos = pos
@@ -201,7 +130,6 @@ class Security(RandomWalker):
         self._new_identity = None
         self.private_preference = private_preference
 
-        # attributes for batch_run and data collection to avoid errors
         self.opinion = None
         self.activation = None
         self.risk_aversion = None
@@ -229,41 +157,48 @@ class Security(RandomWalker):
 
     def advance(self):
         """
-        Advance for security class to determine behavior
+        Advance for security class to determine behavior. Security agents are
+        moved all at once afterwards in ResistanceCascade._move_security.
         """
-        self.update_neighbors()
         self.arrest()
-        self.random_move()
 
     def arrest(self):
         """
         Arrests active neighbor
         """
-        neighbor_cells = self.model.grid.get_neighborhood(self.pos, moore=True)
+        x, y = self.pos
+        if not self.model.arrest_grid[:, x, y].any():
+            return
 
-        # collect arrestable neighbors
-        active_neighbors = []
-        oppose_neighbors = []
-        for neighbor in self.model.grid.get_cell_list_contents(neighbor_cells):
-            if isinstance(neighbor, Citizen) and neighbor.condition == "Active":
-                active_neighbors.append(neighbor)
-            elif (
-                isinstance(neighbor, Citizen)
-                and neighbor.condition == "Oppose"
-                and neighbor.activation > self.model.threshold_constant_sigmoid
-            ):
-                oppose_neighbors.append(neighbor)
+        neighbor_cells = self.model.neighborhood_table(1)[x, y]
+        counts = self.model.count_grid[:, neighbor_cells[:, 0], neighbor_cells[:, 1]]
+
+        # first arrest active neighbors, then oppose neighbors if no active,
+        # skipping the cell lookups when the count grid shows neither
+        if counts[ACTIVE].any():
+            target = ACTIVE
+        elif counts[OPPOSE].any():
+            target = OPPOSE
+        else:
+            return
+
+        # collect arrestable neighbors from the cells holding the target
+        candidate_cells = [tuple(cell) for cell in neighbor_cells[counts[target] > 0].tolist()]
+        candidates = [
+            neighbor
+            for neighbor in self.model.grid.get_cell_list_contents(candidate_cells)
+            if neighbor.condition_code == target
+            and (
+                target == ACTIVE
+                or neighbor.activation > self.model.threshold_constant_sigmoid
+            )
+        ]
+        if not candidates:
+            return
 
-        # first arrest active neighbors, then oppose neighbors if no active
-        if active_neighbors:
-            arrestee = self.random.choice(active_neighbors)
-            sentence = self.random.randint(0, self.model.max_jail_term)
-            arrestee.jail_sentence = sentence
-            arrestee.condition = "Jailed"
-            self.model.grid.remove_agent(arrestee)
-        elif oppose_neighbors:
-            arrestee = self.random.choice(oppose_neighbors)
-            sentence = self.random.randint(0, self.model.max_jail_term)
-            arrestee.jail_sentence = sentence
-            arrestee.condition = "Jailed"
-            self.model.grid.remove_agent(arrestee)
+        arrestee, sentence = self.model.draw_arrest(candidates)
+        arrestee.jail_sentence = sentence
+        arrestee.condition_code = JAILED
+        arrestee_x, arrestee_y = arrestee.pos
+        self.model.count_grid[target, arrestee_x, arrestee_y] -= 1
+        self.model.grid.remove_agent(arrestee)
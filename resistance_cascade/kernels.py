@@ -0,0 +1,211 @@
+import math
+import os
+import threading
+import numpy as np
+from .state import ACTIVE, OPPOSE, SUPPORT, SECURITY
+
+# Numba is optional, fall back to the NumPy expressions without it
+try:
+    from numba import config, njit, prange
+except ImportError:
+    njit = None
+
+# SciPy is optional, expit is a numerically stable sigmoid ufunc
+try:
+    from scipy.special import expit
+except ImportError:
+    expit = None
+
+
+def sigmoid(x):
+    """Sigmoid function, element wise for arrays"""
+    if expit is not None:
+        return expit(x)
+    # tanh form does not overflow for large |x|
+    return 0.5 * (1 + np.tanh(0.5 * np.asarray(x, dtype=float)))
+
+
+def _activate_numpy(
+    slots,
+    in_vision,
+    random_activation,
+    with_security,
+    private_preference,
+    epsilon,
+    epsilon_probability,
+    exp_oppose_threshold,
+    exp_active_threshold,
+    actives_in_vision,
+    opposed_in_vision,
+    support_in_vision,
+    security_in_vision,
+    active_ratio,
+    perception,
+    arrest_prob,
+    opinion,
+    activation,
+    active_level,
+    oppose_level,
+    update_condition_code,
+    flip,
+    ever_flipped,
+):
+    """
+    Activation step as whole-array NumPy expressions over the given slots.
+    Without security agents the arrest probability is zero and its exp is
+    skipped.
+    """
+    # self counts as active and support
+    actives = in_vision[ACTIVE] + 1
+    opposed = in_vision[OPPOSE]
+    support = in_vision[SUPPORT] + 1
+    security = in_vision[SECURITY]
+    epsilon_probability = epsilon_probability[slots]
+
+    # ratio of active and oppose to citizens in vision
+    ratio = (actives + opposed) / support
+
+    # perceptions of support/oppose/active
+    seen = (actives + opposed * epsilon_probability) ** (1.0 / (epsilon[slots] ** 2 + 1))
+
+    # Probability of arrest P, -2.3 produces 0.9 at 1 active (self) and
+    # 1 security, 2 * epsilon_probability is 1.0 with no error
+    if with_security:
+        arrest = 1 - np.exp(-2.3 * (security / actives) * (2 * epsilon_probability))
+    else:
+        arrest = np.zeros(len(slots))
+
+    # flip private preference so negative regime opinion makes citizen
+    # more likely to activate
+    view = -private_preference[slots] + seen * ratio
+
+    # calculate activation levels, sigmoid(opinion - threshold) reuses
+    # exp(-opinion) scaled by the precomputed exp(threshold)
+    exp_view = np.exp(-view)
+    active = 1 / (1 + exp_view * exp_active_threshold[slots]) - arrest
+    oppose = 1 / (1 + exp_view * exp_oppose_threshold[slots]) - arrest
+
+    # assign condition by activation level
+    update = np.where(
+        active > random_activation,
+        ACTIVE,
+        np.where(oppose > random_activation, OPPOSE, SUPPORT),
+    )
+    flipped = (update == ACTIVE) & (update_condition_code[slots] != ACTIVE)
+
+    actives_in_vision[slots] = actives
+    opposed_in_vision[slots] = opposed
+    support_in_vision[slots] = support
+    security_in_vision[slots] = security
+    active_ratio[slots] = ratio
+    perception[slots] = seen
+    arrest_prob[slots] = arrest
+    opinion[slots] = view
+    activation[slots] = sigmoid(view)
+    active_level[slots] = active
+    oppose_level[slots] = oppose
+    update_condition_code[slots] = update
+    flip[slots] = flipped
+    ever_flipped[slots] |= flipped
+
+
+def _activate_scalar(
+    slots,
+    in_vision,
+    random_activation,
+    with_security,
+    private_preference,
+    epsilon,
+    epsilon_probability,
+    exp_oppose_threshold,
+    exp_active_threshold,
+    actives_in_vision,
+    opposed_in_vision,
+    support_in_vision,
+    security_in_vision,
+    active_ratio,
+    perception,
+    arrest_prob,
+    opinion,
+    activation,
+    active_level,
+    oppose_level,
+    update_condition_code,
+    flip,
+    ever_flipped,
+):
+    """
+    Activation step as one fused per-citizen loop, compiled in parallel by
+    Numba. Each citizen's inputs are read and its outputs written in a single
+    pass, without intermediate arrays. Without security agents the arrest
+    probability is zero and its exp is skipped.
+    """
+    for i in prange(len(slots)):
+        s = slots[i]
+        actives = in_vision[ACTIVE, i] + 1
+        opposed = in_vision[OPPOSE, i]
+        support = in_vision[SUPPORT, i] + 1
+        security = in_vision[SECURITY, i]
+
+        ratio = (actives + opposed) / support
+        seen = (actives + opposed * epsilon_probability[s]) ** (
+            1.0 / (epsilon[s] ** 2 + 1)
+        )
+        if with_security:
+            arrest = 1 - math.exp(
+                -2.3 * (security / actives) * (2 * epsilon_probability[s])
+            )
+        else:
+            arrest = 0.0
+        view = -private_preference[s] + seen * ratio
+        exp_view = math.exp(-view)
+        active = 1 / (1 + exp_view * exp_active_threshold[s]) - arrest
+        oppose = 1 / (1 + exp_view * exp_oppose_threshold[s]) - arrest
+
+        if active > random_activation[i]:
+            update = ACTIVE
+        elif oppose > random_activation[i]:
+            update = OPPOSE
+        else:
+            update = SUPPORT
+        flipped = update == ACTIVE and update_condition_code[s] != ACTIVE
+
+        actives_in_vision[s] = actives
+        opposed_in_vision[s] = opposed
+        support_in_vision[s] = support
+        security_in_vision[s] = security
+        active_ratio[s] = ratio
+        perception[s] = seen
+        arrest_prob[s] = arrest
+        opinion[s] = view
+        activation[s] = 1 / (1 + exp_view)
+        active_level[s] = active
+        oppose_level[s] = oppose
+        update_condition_code[s] = update
+        flip[s] = flipped
+        ever_flipped[s] = ever_flipped[s] or flipped
+
+
+# Numba's workqueue threading layer aborts the process when two threads run
+# a parallel kernel at once, so callers on different threads take turns and
+# the kernel is safe on whichever layer Numba loads
+_activate_lock = threading.Lock()
+
+
+if njit is not None:
+    # With calls serialized no layer needs to be threadsafe. TBB goes last,
+    # the process hangs at exit once TBB has started on a thread other than
+    # the main one, which is where Streamlit runs the app. An explicit Numba
+    # setting in the environment takes precedence
+    if not {"NUMBA_THREADING_LAYER", "NUMBA_THREADING_LAYER_PRIORITY"} & set(os.environ):
+        config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
+    _activate_parallel = njit(parallel=True, fastmath=True, cache=True)(_activate_scalar)
+
+    def activate(*args):
+        """
+        Run the compiled activation kernel, one thread at a time.
+        """
+        with _activate_lock:
+            _activate_parallel(*args)
+else:
+    activate = _activate_numpy
@@ -15,25 +15,31 @@ try:
 except ImportError:
     from .agent import Citizen, Security
 
-# Fix Mesa space import for different versions
+# Import citizen state arrays
 try:
-    from mesa.space import MultiGrid
+    from resistance_cascade.state import (
+        CitizenState, CONDITIONS, ACTIVE, OPPOSE, SUPPORT, JAILED, SECURITY
+    )
+    from resistance_cascade.neighborhood import torus_box_sum, neighborhood_table
+    from resistance_cascade.kernels import activate, sigmoid
 except ImportError:
-    try:
-        MultiGrid = mesa.space.MultiGrid
-    except AttributeError:
-        from mesa import space
-        MultiGrid = space.MultiGrid
+    from .state import (
+        CitizenState, CONDITIONS, ACTIVE, OPPOSE, SUPPORT, JAILED, SECURITY
+    )
+    from .neighborhood import torus_box_sum, neighborhood_table
+    from .kernels import activate, sigmoid
 
-# Fix Mesa DataCollector import for different versions
+# Import grid with empty cell tracking
 try:
-    from mesa.datacollection import DataCollector
+    from resistance_cascade.space import EmptyTrackingMultiGrid
 except ImportError:
-    try:
-        DataCollector = mesa.DataCollector
-    except AttributeError:
-        from mesa import datacollection
-        DataCollector = datacollection.DataCollector
+    from .space import EmptyTrackingMultiGrid
+
+# Import array based data collector
+try:
+    from resistance_cascade.datacollection import ArrayDataCollector
+except ImportError:
+    from .datacollection import ArrayDataCollector
 
 
 class ResistanceCascade(mesa.Model):
@@ -61,6 +67,9 @@ class ResistanceCascade(mesa.Model):
         threshold=3.66356,
         seed=None,
         random_seed=False,
+        collect_every=1,
+        sort_every=100,
+        rng=None,
     ):
         super().__init__()
         
@@ -79,6 +88,8 @@ class ResistanceCascade(mesa.Model):
         self._seed = seed
         # Use Mesa's built-in random seeding
         self.reset_randomizer(seed)
+        # NumPy generator for population-wide draws, a caller may pass its own
+        self._rng = rng if rng is not None else np.random.default_rng(seed)
         
         print(f"Running ResistanceCascade with seed {self._seed}")
         log.info(f"Running ResistanceCascade with seed {self._seed}")
@@ -101,7 +112,7 @@ class ResistanceCascade(mesa.Model):
         self.standard_deviation = standard_deviation
         self.epsilon = epsilon
         self.threshold = threshold
-        self.threshold_constant_sigmoid = self.sigmoid(self.threshold)
+        self.threshold_constant_sigmoid = sigmoid(self.threshold)
         self.security_density = security_density
         self.security_vision = security_vision
 
@@ -112,43 +123,62 @@ class ResistanceCascade(mesa.Model):
 
         # Model setup
         self.max_iters = max_iters
+        # agent level snapshots are taken every collect_every steps and at the
+        # end, batch_run reads agent rows only for the steps that have one
+        if collect_every < 1:
+            raise ValueError(f"collect_every must be at least 1, got {collect_every}")
+        self.collect_every = collect_every
+        # citizen slots are re-sorted by cell every sort_every steps
+        self.sort_every = sort_every
         self.random_seed = random_seed
         
         # Initialize grid
-        self.grid = MultiGrid(self.width, self.height, torus=True)
+        self.grid = EmptyTrackingMultiGrid(self.width, self.height, torus=True)
+        self._neighborhood_tables = {}
 
         # Agent counts
         self.support_count = 0
         self.active_count = 0
         self.oppose_count = 0
+        self.jail_count = 0
 
         # Revolution tracking
         self.revolution = False
 
+        # Citizen state arrays, one slot per citizen
+        self.citizens = CitizenState(self.citizen_count)
+
+        # Draw the citizen attributes for the whole population at once
+        n = self.citizen_count
+        # Normal distribution of private regime preference
+        private_preferences = self._rng.normal(
+            self.private_preference_distribution_mean, self.standard_deviation, n
+        )
+        # Error term for information controlled society
+        epsilons = self._rng.normal(0, self.epsilon, n)
+        # Epsilon error term sigmoid value
+        epsilon_probabilities = sigmoid(epsilons)
+        # Threshold calculations, each citizen's spread is its own epsilon
+        thresholds = self.threshold + epsilons[:, None] * self._rng.standard_normal((n, 2))
+        # Threshold for opposition
+        oppose_thresholds = thresholds.min(axis=1)
+        # Threshold for activation
+        active_thresholds = thresholds.max(axis=1)
+        cells = self._rng.integers((0, 0), (self.width, self.height), size=(n, 2))
+
         # Create citizens
-        for i in range(self.citizen_count):
+        for i in range(n):
             pos = None
-            if not self.multiple_agents_per_cell and len(self.grid.empties) > 0:
-                pos = self.random.choice(list(self.grid.empties))
+            if not self.multiple_agents_per_cell and self.grid.exists_empty_cells():
+                pos = self.grid.random_empty_cell(self._rng)
             else:
-                x = self.random.randrange(self.width)
-                y = self.random.randrange(self.height)
-                pos = (x, y)
-                
-            # Normal distribution of private regime preference
-            private_preference = self.random.gauss(
-                self.private_preference_distribution_mean, self.standard_deviation
-            )
-            # Error term for information controlled society
-            epsilon = self.random.gauss(0, self.epsilon)
-            # Epsilon error term sigmoid value
-            epsilon_probability = self.sigmoid(epsilon)
-            # Threshold calculations
-            thresholds = [self.random.gauss(self.threshold, epsilon) for _ in range(0, 2)]
-            # Threshold for opposition
-            oppose_threshold = min(thresholds)
-            # Threshold for activation
-            active_threshold = max(thresholds)
+                pos = (int(cells[i, 0]), int(cells[i, 1]))
+
+            private_preference = float(private_preferences[i])
+            epsilon = float(epsilons[i])
+            epsilon_probability = float(epsilon_probabilities[i])
+            oppose_threshold = float(oppose_thresholds[i])
+            active_threshold = float(active_thresholds[i])
             
             citizen = Citizen(
                 self.next_id(),
@@ -164,20 +194,33 @@ class ResistanceCascade(mesa.Model):
             self.grid.place_agent(citizen, pos)
             self.schedule.add(citizen)
 
+        self.citizens.unique_id[:] = [agent.unique_id for agent in self.citizens.agents]
+
+        # Thresholds are fixed, so activation only needs one exp per citizen
+        self.citizens.exp_oppose_threshold[:] = np.exp(self.citizens.oppose_threshold)
+        self.citizens.exp_active_threshold[:] = np.exp(self.citizens.active_threshold)
+
+        # Lay the citizen state out in grid order
+        self.citizens.sort_by_cell()
+
+        # Draw the security attributes for all agents at once
+        # Normal distribution of private regime preference
+        security_preferences = self._rng.normal(
+            self.private_preference_distribution_mean, self.standard_deviation, self.security_count
+        )
+        security_cells = self._rng.integers(
+            (0, 0), (self.width, self.height), size=(self.security_count, 2)
+        )
+
         # Create Security agents
         for i in range(self.security_count):
             pos = None
-            if not self.multiple_agents_per_cell and len(self.grid.empties) > 0:
-                pos = self.random.choice(list(self.grid.empties))
+            if not self.multiple_agents_per_cell and self.grid.exists_empty_cells():
+                pos = self.grid.random_empty_cell(self._rng)
             else:
-                x = self.random.randrange(self.width)
-                y = self.random.randrange(self.height)
-                pos = (x, y)
+                pos = (int(security_cells[i, 0]), int(security_cells[i, 1]))
 
-            # Normal distribution of private regime preference
-            private_preference = self.random.gauss(
-                self.private_preference_distribution_mean, self.standard_deviation
-            )
+            private_preference = float(security_preferences[i])
 
             security = Security(
                 self.next_id(),
@@ -205,59 +248,78 @@ class ResistanceCascade(mesa.Model):
             "Revolution": self.report_revolution,
         }
         
-        agent_reporters = {
-            "pos": lambda a: getattr(a, "pos", None),
-            "condition": lambda a: getattr(a, "condition", None),
-            "opinion": lambda a: getattr(a, "opinion", None),
-            "activation": lambda a: getattr(a, "activation", None),
-            "private_preference": lambda a: getattr(a, "private_preference", None),
-            "epsilon": lambda a: getattr(a, "epsilon", None),
-            "oppose_threshold": lambda a: getattr(a, "oppose_threshold", None),
-            "active_threshold": lambda a: getattr(a, "active_threshold", None),
-            "jail_sentence": lambda a: getattr(a, "jail_sentence", None),
-            "actives_in_vision": lambda a: getattr(a, "actives_in_vision", None),
-            "opposed_in_vision": lambda a: getattr(a, "opposed_in_vision", None),
-            "support_in_vision": lambda a: getattr(a, "support_in_vision", None),
-            "security_in_vision": lambda a: getattr(a, "security_in_vision", None),
-            "perception": lambda a: getattr(a, "perception", None),
-            "arrest_prob": lambda a: getattr(a, "arrest_prob", None),
-            "active_level": lambda a: getattr(a, "active_level", None),
-            "oppose_level": lambda a: getattr(a, "oppose_level", None),
-            "flip": lambda a: getattr(a, "flip", None),
-            "ever_flipped": lambda a: getattr(a, "ever_flipped", None),
-            "model_seed": lambda a: getattr(a, "dc_seed", None),
-            "model_security_density": lambda a: getattr(a, "dc_security_density", None),
-            "model_private_preference": lambda a: getattr(a, "dc_private_preference", None),
-            "model_epsilon": lambda a: getattr(a, "dc_epsilon", None),
-            "model_threshold": lambda a: getattr(a, "dc_threshold", None),
+        # Agent reporters run once per snapshot over the citizen state arrays,
+        # off-grid (jailed) citizens report pos (-1, -1)
+        c = self.citizens
+        array_reporters = {
+            "pos": lambda m: np.column_stack((c.x, c.y)),
+            "condition": lambda m: np.array(CONDITIONS)[c.condition_code],
+            "opinion": lambda m: c.opinion,
+            "activation": lambda m: c.activation,
+            "private_preference": lambda m: c.private_preference,
+            "epsilon": lambda m: c.epsilon,
+            "oppose_threshold": lambda m: c.oppose_threshold,
+            "active_threshold": lambda m: c.active_threshold,
+            "jail_sentence": lambda m: c.jail_sentence,
+            "actives_in_vision": lambda m: c.actives_in_vision,
+            "opposed_in_vision": lambda m: c.opposed_in_vision,
+            "support_in_vision": lambda m: c.support_in_vision,
+            "security_in_vision": lambda m: c.security_in_vision,
+            "perception": lambda m: c.perception,
+            "arrest_prob": lambda m: c.arrest_prob,
+            "active_level": lambda m: c.active_level,
+            "oppose_level": lambda m: c.oppose_level,
+            "flip": lambda m: c.flip,
+            "ever_flipped": lambda m: c.ever_flipped,
+            "model_seed": lambda m: m._seed,
+            "model_security_density": lambda m: m.security_density,
+            "model_private_preference": lambda m: m.private_preference_distribution_mean,
+            "model_epsilon": lambda m: m.epsilon,
+            "model_threshold": lambda m: m.threshold,
         }
-        
-        self.datacollector = DataCollector(
-            model_reporters=model_reporters, agent_reporters=agent_reporters
+
+        self.datacollector = ArrayDataCollector(
+            model_reporters=model_reporters,
+            array_reporters=array_reporters,
+            agent_ids=lambda m: c.unique_id,
         )
 
         # Set citizen states prior to first step
-        for agent in self.schedule.agents_by_type[Citizen].values():
-            agent.neighborhood = agent.update_neighbors()
-            agent.determine_condition()
+        self._step_citizens()
 
         # Start the model
         self.running = True
+        self._tally()
         self.datacollector.collect(self)
 
     def step(self):
         """
         Advance the model by one step and collect data.
         """
+        # citizens drift, so restore the grid order of the state arrays
+        if self.sort_every and self.schedule.steps and self.schedule.steps % self.sort_every == 0:
+            self.citizens.sort_by_cell()
+
+        self._step_citizens()
+        self._advance_citizens()
+        # refresh the counts after citizens moved, security arrests read them
+        if self.security_count:
+            self._update_count_grid()
+            self._update_arrest_grid()
+            # draws for the security phase, each agent arrests at most once
+            self._arrest_draws = self._rng.random(self.security_count).tolist()
+            self._sentences = self._rng.integers(
+                0, self.max_jail_term, size=self.security_count, endpoint=True
+            ).tolist()
         self.schedule.step()
+        if self.security_count:
+            self._move_security()
+        self._tally()
         self.time += 1
         self.iteration += 1
         
-        # Check revolution condition
-        active_or_jailed_agents = sum(
-            1 for agent in self.schedule.agents 
-            if type(agent) is Citizen and (agent.condition == "Active" or agent.condition == "Jailed")
-        )
+        # Check revolution condition from the cached tally
+        active_or_jailed_agents = self.active_count + self.jail_count
         proportion_active_or_jailed = active_or_jailed_agents / self.citizen_count
 
         # Check stop condition
@@ -267,18 +329,216 @@ class ResistanceCascade(mesa.Model):
             self.revolution = True
             self.running = False
 
-        # Collect data
-        self.datacollector.collect(self)
-
-        # Update agent counts
-        self.active_count = self.count_active(self)
-        self.support_count = self.count_support(self)
-        self.oppose_count = self.count_oppose(self)
-
         # Check max iterations
         if self.iteration > self.max_iters:
             self.running = False
 
+        # Collect data, agent snapshots every collect_every steps and at the end
+        self.datacollector.collect(
+            self,
+            agents=self.schedule.steps % self.collect_every == 0 or not self.running,
+        )
+
+    def step_n(self, n, counts=None):
+        """
+        Advance the model by up to n steps, stopping early once it is no
+        longer running. If counts is given, the active, support, oppose and
+        jail counts after each step are written to its rows.
+
+        Returns the number of steps taken.
+        """
+        for i in range(n):
+            if not self.running:
+                return i
+            self.step()
+            if counts is not None:
+                counts[i] = self.active_count, self.support_count, self.oppose_count, self.jail_count
+        return n
+
+    def _tally(self):
+        """
+        Count citizens by condition in one pass over the condition codes and
+        cache the counts read by step and the reporters.
+        """
+        counts = np.bincount(self.citizens.condition_code, minlength=len(CONDITIONS))
+        self.active_count = int(counts[ACTIVE])
+        self.oppose_count = int(counts[OPPOSE])
+        self.support_count = int(counts[SUPPORT])
+        self.jail_count = int(counts[JAILED])
+
+    def neighborhood_table(self, radius):
+        """
+        Wrapped Moore neighborhood table of the grid for radius, built once.
+        """
+        if radius not in self._neighborhood_tables:
+            self._neighborhood_tables[radius] = neighborhood_table(
+                self.width, self.height, radius
+            )
+        return self._neighborhood_tables[radius]
+
+    def _update_count_grid(self):
+        """
+        Rebuild the per-cell agent counts, one channel per condition code plus
+        one for security agents. Arrests keep the citizen channels current
+        during the security phase; the security channel is not updated as
+        security agents move.
+        """
+        c = self.citizens
+        on_grid = c.x >= 0
+        codes = c.condition_code[on_grid].astype(np.intp)
+        x = c.x[on_grid]
+        y = c.y[on_grid]
+
+        security_pos = [agent.pos for agent in self.schedule.agent_lists[Security]]
+        if security_pos:
+            security_x, security_y = np.array(security_pos, dtype=np.intp).T
+            codes = np.concatenate((codes, np.full(len(security_pos), SECURITY)))
+            x = np.concatenate((x, security_x))
+            y = np.concatenate((y, security_y))
+
+        cells = (codes * self.width + x) * self.height + y
+        self.count_grid = np.bincount(
+            cells, minlength=(SECURITY + 1) * self.width * self.height
+        ).reshape(SECURITY + 1, self.width, self.height)
+
+    def _update_arrest_grid(self):
+        """
+        Count the active and opposing citizens adjacent to every cell in one
+        box sum, so security agents with nobody to arrest skip their lookup.
+        Counts only fall while arrests run, so a zero stays valid all step.
+        """
+        citizens = self.count_grid[[ACTIVE, OPPOSE]]
+        self.arrest_grid = torus_box_sum(citizens, 1) - citizens
+
+    def _step_citizens(self):
+        """
+        Decide the next condition of every free citizen at once.
+
+        Neighbor counts are read from a box sum over the count grid, then
+        perception, arrest probability, opinion and activation levels are
+        computed by the activation kernel over the citizen state.
+        """
+        c = self.citizens
+        c.flip[:] = False
+
+        # jailed citizens keep their previous state
+        free = np.flatnonzero((c.jail_sentence <= 0) & (c.condition_code != JAILED))
+
+        # count neighbors of each type, excluding the citizen's own cell
+        self._update_count_grid()
+        x, y = c.x[free], c.y[free]
+        in_vision = (
+            torus_box_sum(self.count_grid, self.citizen_vision)[:, x, y]
+            - self.count_grid[:, x, y]
+        )
+        # uniform random activation 0.0 - 1.0
+        random_activation = self._rng.random(len(free))
+
+        # the kernel writes its results straight into the citizen state
+        activate(
+            free,
+            in_vision,
+            random_activation,
+            self.security_count > 0,
+            c.private_preference,
+            c.epsilon,
+            c.epsilon_probability,
+            c.exp_oppose_threshold,
+            c.exp_active_threshold,
+            c.actives_in_vision,
+            c.opposed_in_vision,
+            c.support_in_vision,
+            c.security_in_vision,
+            c.active_ratio,
+            c.perception,
+            c.arrest_prob,
+            c.opinion,
+            c.activation,
+            c.active_level,
+            c.oppose_level,
+            c.update_condition_code,
+            c.flip,
+            c.ever_flipped,
+        )
+
+    def _advance_citizens(self):
+        """
+        Serve jail sentences, release citizens whose sentence is over, apply
+        the pending conditions and move every free citizen.
+        """
+        c = self.citizens
+
+        # jail sentence
+        serving = c.jail_sentence > 0
+        c.jail_sentence[serving] -= 1
+        for slot in np.flatnonzero(~serving & (c.condition_code == JAILED)):
+            agent = c.agents[slot]
+            agent.pos = self.grid.random_empty_cell(self._rng)
+            self.grid.place_agent(agent, agent.pos)
+
+        # update condition
+        free = np.flatnonzero(~serving)
+        c.condition_code[free] = c.update_condition_code[free]
+
+        # random movement
+        self._move_citizens(free)
+
+    def _move_citizens(self, slots):
+        """
+        Step each citizen in slots one cell in any Moore direction, or stay.
+        """
+        c = self.citizens
+
+        # moves depend on each other when cells hold a single agent
+        if not self.multiple_agents_per_cell:
+            for slot in slots:
+                c.agents[slot].random_move()
+            return
+
+        # one batched draw over the 3x3 neighborhood including the center
+        old_x, old_y = c.x[slots], c.y[slots]
+        dx, dy = self._rng.integers(-1, 2, size=(2, len(slots)))
+        new_x = (old_x + dx) % self.width
+        new_y = (old_y + dy) % self.height
+        c.x[slots] = new_x
+        c.y[slots] = new_y
+
+        self.grid.move_agents(
+            [c.agents[slot] for slot in slots], old_x, old_y, new_x, new_y
+        )
+
+    def _move_security(self):
+        """
+        Step every security agent one cell in any Moore direction, or stay.
+        """
+        agents = self.schedule.agent_lists[Security]
+
+        # moves depend on each other when cells hold a single agent
+        if not self.multiple_agents_per_cell:
+            for agent in agents:
+                agent.random_move()
+            return
+
+        if not agents:
+            return
+
+        # one batched draw over the 3x3 neighborhood including the center
+        old_cells = np.array([agent.pos for agent in agents], dtype=np.intp)
+        steps = self._rng.integers(-1, 2, size=(len(agents), 2))
+        new_cells = (old_cells + steps) % (self.width, self.height)
+
+        self.grid.move_agents(agents, *old_cells.T, *new_cells.T)
+        for agent, cell in zip(agents, new_cells.tolist()):
+            agent.pos = tuple(cell)
+
+    def draw_arrest(self, candidates):
+        """
+        Pick an arrestee from candidates and a jail sentence, both from the
+        draws made for this step's security phase.
+        """
+        arrestee = candidates[int(self._arrest_draws.pop() * len(candidates))]
+        return arrestee, self._sentences.pop()
+
     def distance_calculation(self, agent1, agent2):
         """Helper method to calculate distance between two agents."""
         return math.sqrt(
@@ -287,7 +547,7 @@ class ResistanceCascade(mesa.Model):
 
     def sigmoid(self, x):
         """Sigmoid function"""
-        return 1 / (1 + math.exp(-x))
+        return sigmoid(x)
 
     # Static reporter methods
     @staticmethod
@@ -303,44 +563,27 @@ class ResistanceCascade(mesa.Model):
     @staticmethod
     def speed_of_spread(model):
         """Calculates the speed of transmission of the rebellion."""
-        return (
-            len([
-                agent for agent in model.schedule.agents_by_type[Citizen].values()
-                if agent.flip is True
-            ]) / model.citizen_count
-        )
+        return np.count_nonzero(model.citizens.flip) / model.citizen_count
 
     @staticmethod
     def count_active(model):
         """Helper method to count active agents."""
-        return len([
-            agent for agent in model.schedule.agents_by_type[Citizen].values()
-            if agent.condition == "Active"
-        ])
+        return model.active_count
 
     @staticmethod
     def count_oppose(model):
         """Helper method to count publicly opposing agents."""
-        return len([
-            agent for agent in model.schedule.agents_by_type[Citizen].values()
-            if agent.condition == "Oppose"
-        ])
+        return model.oppose_count
 
     @staticmethod
     def count_support(model):
         """Helper method to count publicly supporting agents."""
-        return len([
-            agent for agent in model.schedule.agents_by_type[Citizen].values()
-            if agent.condition == "Support"
-        ])
+        return model.support_count
 
     @staticmethod
     def count_jail(model):
         """Helper method to count jailed agents."""
-        return len([
-            agent for agent in model.schedule.agents_by_type[Citizen].values()
-            if agent.condition == "Jailed"
-        ])
+        return model.jail_count
 
     @staticmethod
     def report_security_density(model):
@@ -0,0 +1,50 @@
+import numpy as np
+
+
+def _window_sum(values, radius):
+    """
+    Sum values over a wrapped window of +/- radius along the last axis.
+    """
+    n = values.shape[-1]
+    if 2 * radius + 1 >= n:
+        # window covers the whole axis
+        return np.repeat(values.sum(axis=-1, keepdims=True), n, axis=-1)
+
+    padded = np.concatenate(
+        (values[..., n - radius:], values, values[..., :radius]), axis=-1
+    )
+    cumulative = np.cumsum(padded, axis=-1)
+    cumulative = np.concatenate(
+        (np.zeros_like(cumulative[..., :1]), cumulative), axis=-1
+    )
+    return cumulative[..., 2 * radius + 1:] - cumulative[..., :n]
+
+
+def torus_box_sum(grid, radius):
+    """
+    Sum grid over the Moore neighborhood of the given radius around every
+    cell of its last two axes, wrapping around the edges like a torus grid.
+
+    The center cell is included; subtract it to match a neighborhood built
+    with include_center=False.
+    """
+    along_y = _window_sum(grid, radius)
+    return np.swapaxes(_window_sum(np.swapaxes(along_y, -1, -2), radius), -1, -2)
+
+
+def neighborhood_table(width, height, radius, include_center=False):
+    """
+    Wrapped Moore neighborhood coordinates of every cell of a torus grid.
+
+    Returns an int16 array of shape (width, height, k, 2), so the neighborhood
+    of (x, y) is table[x, y] without redoing the wrap arithmetic per query.
+    """
+    # an axis narrower than the window is covered once, as Mesa deduplicates
+    dx = np.arange(-radius, radius + 1) if 2 * radius + 1 <= width else np.arange(width)
+    dy = np.arange(-radius, radius + 1) if 2 * radius + 1 <= height else np.arange(height)
+    offsets = np.array([(i, j) for i in dx for j in dy if include_center or i or j])
+
+    table = np.empty((width, height, len(offsets), 2), dtype=np.int16)
+    table[..., 0] = (np.arange(width)[:, None, None] + offsets[:, 0]) % width
+    table[..., 1] = (np.arange(height)[None, :, None] + offsets[:, 1]) % height
+    return table
@@ -21,22 +21,6 @@ class RandomWalker(mesaAgent):
         self.pos = pos
         self.moore = moore
 
-        # model parameters because datacollector needs agent level access
-        self.dc_private_preference = self.model.private_preference_distribution_mean
-        self.dc_security_density = self.model.security_density
-        self.dc_epsilon = self.model.epsilon
-        self.dc_seed = self.model._seed
-        self.dc_threshold = self.model.threshold
-
-    def update_neighbors(self):
-        """
-        Update the list of neighbors.
-        """
-        self.neighborhood = self.model.grid.get_neighborhood(
-            self.pos, moore=True, radius=self.vision
-        )
-        self.neighbors = self.model.grid.get_cell_list_contents(self.neighborhood)
-
     def random_move(self):
         """
         Step one cell in any allowable direction.
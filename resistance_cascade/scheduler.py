@@ -1,4 +1,4 @@
-from typing import Type, Callable, Dict, Any
+from typing import Type, Callable, Dict, List, Any
 from mesa.agent import Agent
 from mesa.model import Model
 from collections import defaultdict
@@ -22,6 +22,9 @@ class SimultaneousActivationByTypeFiltered(SimultaneousActivation):
     A scheduler that overrides the get_type_count method to allow for filtering
     of agents by a function before counting.
 
+    Agents are also kept in one contiguous list per type, which the per-type
+    queries and the step loop iterate instead of the id dictionaries.
+
     Example:
     >>> scheduler = SimultaneousActivationByTypeFiltered(model)
     >>> scheduler.get_type_count(AgentA, lambda agent: agent.some_attribute > 10)
@@ -30,6 +33,7 @@ class SimultaneousActivationByTypeFiltered(SimultaneousActivation):
     def __init__(self, model: Model) -> None:
         super().__init__(model)
         self.agents_by_type: Dict[Type[Agent], Dict[int, Agent]] = defaultdict(dict)
+        self.agent_lists: Dict[Type[Agent], List[Agent]] = defaultdict(list)
 
     def add(self, agent: Agent) -> None:
         """
@@ -41,6 +45,7 @@ class SimultaneousActivationByTypeFiltered(SimultaneousActivation):
         super().add(agent)
         agent_class = type(agent)
         self.agents_by_type[agent_class][agent.unique_id] = agent
+        self.agent_lists[agent_class].append(agent)
 
     def remove(self, agent: Agent) -> None:
         """
@@ -50,6 +55,20 @@ class SimultaneousActivationByTypeFiltered(SimultaneousActivation):
         agent_class = type(agent)
         if agent.unique_id in self.agents_by_type[agent_class]:
             del self.agents_by_type[agent_class][agent.unique_id]
+            self.agent_lists[agent_class].remove(agent)
+
+    def step(self) -> None:
+        """
+        Step all agents, then advance them, walking the per-type lists in the
+        order the types were first added.
+        """
+        agents = [agent for agents in self.agent_lists.values() for agent in agents]
+        for agent in agents:
+            agent.step()
+        for agent in agents:
+            agent.advance()
+        self.steps += 1
+        self.time += 1
 
     def get_type_count(
         self,
@@ -60,14 +79,13 @@ class SimultaneousActivationByTypeFiltered(SimultaneousActivation):
         Returns the current number of agents of certain type in the queue 
         that satisfy the filter function.
         """
-        count = 0
-        for agent in self.agents_by_type[type_class].values():
-            if filter_func is None or filter_func(agent):
-                count += 1
-        return count
+        agents = self.agent_lists[type_class]
+        if filter_func is None:
+            return len(agents)
+        return sum(1 for agent in agents if filter_func(agent))
 
     def get_agents_of_type(self, type_class: Type[Agent]):
         """
         Returns all agents of a given type.
         """
-        return list(self.agents_by_type[type_class].values())
\ No newline at end of file
+        return list(self.agent_lists[type_class])
\ No newline at end of file
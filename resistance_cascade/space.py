@@ -0,0 +1,88 @@
+import numpy as np
+from mesa.agent import Agent
+
+# Alternative import method
+import mesa
+
+# Try different import methods depending on Mesa version
+try:
+    from mesa.space import MultiGrid
+except ImportError:
+    try:
+        MultiGrid = mesa.space.MultiGrid
+    except AttributeError:
+        from mesa import space
+        MultiGrid = space.MultiGrid
+
+
+class EmptyTrackingMultiGrid(MultiGrid):
+    """
+    A MultiGrid that keeps the number of agents in every cell in an array,
+    so empty cells are found with one array scan and a batch of moves
+    updates the counts with two bincounts, instead of per-cell bookkeeping
+    of an empty cell list.
+
+    Example:
+    >>> grid = EmptyTrackingMultiGrid(40, 40, torus=True)
+    >>> pos = grid.random_empty_cell(np.random.default_rng(42))
+    """
+
+    def __init__(self, width: int, height: int, torus: bool) -> None:
+        super().__init__(width, height, torus)
+        self.occupancy = np.zeros((width, height), dtype=np.int32)
+
+    def place_agent(self, agent: Agent, pos) -> None:
+        """
+        Place the agent at the specified location, and set its pos variable.
+        """
+        super().place_agent(agent, pos)
+        x, y = pos
+        self.occupancy[x, y] = len(self._grid[x][y])
+
+    def remove_agent(self, agent: Agent) -> None:
+        """
+        Remove the agent from the given location and set its pos attribute to
+        None.
+        """
+        x, y = agent.pos
+        super().remove_agent(agent)
+        self.occupancy[x, y] = len(self._grid[x][y])
+
+    def move_agents(self, agents, old_x, old_y, new_x, new_y) -> None:
+        """
+        Move many agents between cells in one pass, agents[i] from
+        (old_x[i], old_y[i]) to (new_x[i], new_y[i]). The caller is
+        responsible for the agents' pos attribute, only grid contents and
+        counts are updated here.
+        """
+        grid = self._grid
+        for agent, x0, y0, x1, y1 in zip(
+            agents, old_x.tolist(), old_y.tolist(), new_x.tolist(), new_y.tolist()
+        ):
+            if x0 != x1 or y0 != y1:
+                grid[x0][y0].remove(agent)
+                grid[x1][y1].append(agent)
+
+        old_cells = old_x * self.height + old_y
+        new_cells = new_x * self.height + new_y
+        self.occupancy += (
+            np.bincount(new_cells, minlength=self.num_cells)
+            - np.bincount(old_cells, minlength=self.num_cells)
+        ).reshape(self.width, self.height)
+        # Mesa's empties set is rebuilt on its next use
+        self._empties_built = False
+
+    def exists_empty_cells(self) -> bool:
+        """
+        Return True if any cells empty else False.
+        """
+        return not self.occupancy.all()
+
+    def random_empty_cell(self, rng):
+        """
+        Returns a random empty cell drawn with the given NumPy generator.
+        """
+        empty = np.flatnonzero(self.occupancy.ravel() == 0)
+        if not len(empty):
+            raise Exception("ERROR: No empty cells")
+        return divmod(int(empty[rng.integers(len(empty))]), self.height)
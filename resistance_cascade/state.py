@@ -0,0 +1,126 @@
+import numpy as np
+
+
+# Citizen condition codes stored in the state arrays
+ACTIVE = 0
+OPPOSE = 1
+SUPPORT = 2
+JAILED = 3
+
+# Count grid channel for security agents
+SECURITY = 4
+
+CONDITIONS = ("Active", "Oppose", "Support", "Jailed")
+CONDITION_CODES = {name: code for code, name in enumerate(CONDITIONS)}
+
+
+def morton_code(x, y, bits=16):
+    """
+    Interleave the bits of x and y into a Z-order curve index, so cells that
+    are close on the grid get close codes.
+    """
+    x = np.asarray(x, dtype=np.uint64)
+    y = np.asarray(y, dtype=np.uint64)
+    code = np.zeros(x.shape, dtype=np.uint64)
+    one = np.uint64(1)
+    for bit in range(bits):
+        shift = np.uint64(bit)
+        code |= ((x >> shift) & one) << (shift + shift)
+        code |= ((y >> shift) & one) << (shift + shift + one)
+    return code
+
+
+class CitizenState:
+    """
+    Structure-of-arrays storage for the citizen population.
+
+    Every citizen owns one slot in each array, so model level computations can
+    run as whole-array NumPy expressions instead of per-agent Python calls.
+    Float state is single precision, which is ample for quantities that are
+    compared against a uniform random draw each step.
+    """
+
+    def __init__(self, n):
+        """
+        n: The number of citizen slots to allocate.
+        """
+        self.agents = []
+        self.unique_id = np.zeros(n, dtype=np.int64)
+
+        # agent position, -1 while off the grid
+        self.x = np.full(n, -1, dtype=np.intp)
+        self.y = np.full(n, -1, dtype=np.intp)
+
+        # agent personality attributes
+        self.private_preference = np.zeros(n, dtype=np.float32)
+        self.epsilon = np.zeros(n, dtype=np.float32)
+        self.epsilon_probability = np.zeros(n, dtype=np.float32)
+        self.oppose_threshold = np.zeros(n, dtype=np.float32)
+        self.active_threshold = np.zeros(n, dtype=np.float32)
+        # exp of the thresholds, fixed once the population is created
+        self.exp_oppose_threshold = np.zeros(n, dtype=np.float32)
+        self.exp_active_threshold = np.zeros(n, dtype=np.float32)
+
+        # agent condition attributes
+        self.condition_code = np.full(n, SUPPORT, dtype=np.int8)
+        self.update_condition_code = np.full(n, SUPPORT, dtype=np.int8)
+        self.flip = np.zeros(n, dtype=bool)
+        self.ever_flipped = np.zeros(n, dtype=bool)
+        self.jail_sentence = np.zeros(n, dtype=np.int32)
+
+        # agent memory attributes
+        self.actives_in_vision = np.ones(n, dtype=np.int32)
+        self.opposed_in_vision = np.zeros(n, dtype=np.int32)
+        self.support_in_vision = np.zeros(n, dtype=np.int32)
+        self.security_in_vision = np.zeros(n, dtype=np.int32)
+        self.active_ratio = np.zeros(n, dtype=np.float32)
+        self.perception = np.zeros(n, dtype=np.float32)
+        self.arrest_prob = np.zeros(n, dtype=np.float32)
+        self.opinion = np.zeros(n, dtype=np.float32)
+        self.activation = np.zeros(n, dtype=np.float32)
+        self.active_level = np.zeros(n, dtype=np.float32)
+        self.oppose_level = np.zeros(n, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.agents)
+
+    def register(self, agent):
+        """
+        Assign the next free slot to agent and return it.
+        """
+        self.agents.append(agent)
+        return len(self.agents) - 1
+
+    def sort_by_cell(self):
+        """
+        Reorder the slots along a Z-order curve of the citizens' cells, so
+        citizens close on the grid sit close in memory and the per-cell
+        lookups of a sweep stay in cache. Off-grid citizens go last.
+        """
+        on_grid = self.x >= 0
+        code = morton_code(np.where(on_grid, self.x, 0), np.where(on_grid, self.y, 0))
+        order = np.lexsort((code, ~on_grid))
+
+        for value in vars(self).values():
+            if isinstance(value, np.ndarray):
+                value[:] = value[order]
+        self.agents = [self.agents[i] for i in order]
+        for slot, agent in enumerate(self.agents):
+            agent.slot = slot
+
+
+class SlotAttribute:
+    """
+    Descriptor exposing one slot of a CitizenState array as an agent attribute.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, agent, owner=None):
+        if agent is None:
+            return self
+        return getattr(agent.model.citizens, self.name).item(agent.slot)
+
+    def __set__(self, agent, value):
+        getattr(agent.model.citizens, self.name)[agent.slot] = value
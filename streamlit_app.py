@@ -5,12 +5,302 @@ Web version of your model with real-time visualization
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+import io
 import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-# Import your model
-from resistance_cascade.model import ResistanceCascade
+
+@st.cache_resource(show_spinner=False)
+def model_class():
+    """
+    Import the model on first use instead of at the top of the script, so the
+    page renders before Mesa and the Numba kernels are loaded.
+    """
+    from resistance_cascade.model import ResistanceCascade
+    return ResistanceCascade
+
+
+@st.cache_resource(show_spinner=False)
+def altair_module():
+    """
+    Import Altair on the first chart instead of at the top of the script,
+    so a page without charts renders without loading it.
+    """
+    import altair
+    return altair
+
+
+# Most simulations stepping at once across all sessions of the server. The
+# activation kernel already spreads each step over every core, so a second
+# run would only compete for them. Concurrent kernel calls, such as the
+# warm-up on the script thread, are serialized in resistance_cascade.kernels
+SIMULATION_WORKERS = 1
+
+
+@st.cache_resource(show_spinner=False)
+def simulation_executor():
+    """
+    Worker thread shared by every session, so the model steps off the
+    script thread and a busy server queues runs instead of starting them all.
+    """
+    return ThreadPoolExecutor(max_workers=SIMULATION_WORKERS, thread_name_prefix='simulation')
+
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def cached_run(width, height, citizen_density, security_density, epsilon, pp_mean, threshold, seed, max_iters):
+    """
+    Storage for one finished run, filled in once the run completes. The model
+    is seeded, so identical settings reuse the same results instead of
+    simulating again.
+    """
+    return {}
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def results_csv(run_key, _columns):
+    """
+    CSV bytes of the results columns, written by NumPy straight from the
+    arrays, integers as is and rates to one decimal. The columns are not
+    hashed, run_key names the settings they were produced from, so each run
+    is serialized once.
+    """
+    formats = ['%d' if np.issubdtype(values.dtype, np.integer) else '%.1f' for values in _columns.values()]
+    buffer = io.BytesIO()
+    np.savetxt(
+        buffer, np.column_stack(list(_columns.values())), fmt=formats,
+        delimiter=',', header=','.join(_columns), comments=''
+    )
+    return buffer.getvalue()
+
+
+# Columns of the saved run history, one list per column
+HISTORY_COLUMNS = (
+    'timestamp', 'epsilon', 'security_density', 'pp_mean', 'threshold',
+    'revolution', 'max_participation', 'peak_time', 'final_active'
+)
+
+# History parameter labels and their keys in the saved run parameters
+PARAM_KEYS = {
+    'ε': 'epsilon',
+    'Security': 'security_density',
+    'Preference': 'pp_mean',
+    'Threshold': 'threshold'
+}
+
+# Most recent runs shown in the history table by default
+HISTORY_ROWS = 50
+
+# Most runs kept in the session, older runs are dropped first
+HISTORY_LIMIT = 200
+
+
+def empty_history():
+    """
+    Run history with no runs, stored column-wise so the History tab reads
+    whole columns instead of walking one record per run. Each column keeps
+    the last HISTORY_LIMIT runs, so a long session does not grow without
+    bound.
+    """
+    return {column: deque(maxlen=HISTORY_LIMIT) for column in HISTORY_COLUMNS}
+
+
+def clear_history():
+    """
+    Clear History button callback. Callbacks run before the script, so the
+    same run draws the empty History tab without a second st.rerun pass.
+    """
+    st.session_state.history = empty_history()
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def history_table(count, last_timestamp, _history):
+    """
+    Table of the saved runs. The history is not hashed, every saved run
+    changes its last timestamp, so its length and last timestamp identify
+    its contents.
+    """
+    return pd.DataFrame({
+        'Time': [t.strftime('%H:%M:%S') for t in _history['timestamp']],
+        'ε': _history['epsilon'],
+        'Security': _history['security_density'],
+        'Preference': _history['pp_mean'],
+        'Threshold': _history['threshold'],
+        'Revolution': np.where(_history['revolution'], '✅', '❌'),
+        'Peak Rate': [f"{x:.1f}%" for x in _history['max_participation']],
+        'Peak Time': _history['peak_time']
+    })
+
+
+def run_steps(model, max_iters, counts, interval):
+    """
+    Step the model until it stops or reaches max_iters, writing the active,
+    support, oppose and jail counts of each step into the rows of counts.
+    The model runs in batches that end on multiples of interval and on the
+    last step. Batches run on a simulation_executor worker, which keeps
+    stepping while the script thread draws, and the index of each batch's
+    last step is yielded with whether it ends the run, so the caller only
+    redraws when there is something to show.
+    """
+    finished = queue.Queue()
+    cancelled = threading.Event()
+
+    def simulate():
+        step = 0
+        try:
+            while model.running and step < max_iters and not cancelled.is_set():
+                batch = min(-(-step // interval) * interval - step + 1, max_iters - step)
+                step += model.step_n(batch, counts[step:step + batch])
+                finished.put((step - 1, not model.running or step == max_iters))
+        finally:
+            finished.put(None)
+
+    future = simulation_executor().submit(simulate)
+    try:
+        for batch_end in iter(finished.get, None):
+            yield batch_end
+        # re-raise an error from the worker
+        future.result()
+    finally:
+        # a stopped script leaves the loop early, stop the worker with it
+        cancelled.set()
+
+
+# Line colors of the population states
+STATE_COLORS = {
+    'Active Protesters': '#FE6100',
+    'Supporters': '#648FFF',
+    'Opponents': '#A020F0',
+    'Arrested': '#000000'
+}
+
+# Most points drawn per chart line, more than the chart has pixels to show
+CHART_POINTS = 200
+
+
+def decimate(time_steps, *series, max_points=CHART_POINTS):
+    """
+    Thin the series to at most max_points evenly spaced steps, keeping the
+    first and last step, so long runs chart the same number of points as
+    short ones.
+    """
+    n = len(time_steps)
+    if n <= max_points:
+        return (time_steps,) + series
+    index = np.linspace(0, n - 1, max_points).round().astype(np.intp)
+    return tuple(values[index] for values in (time_steps,) + series)
+
+
+@st.cache_resource(show_spinner=False)
+def population_template(title, line_width):
+    """
+    Encodings of the population chart without data. Encoding validates the
+    whole spec, so it is done once per title and the redraws only swap data.
+    """
+    alt = altair_module()
+    return alt.Chart(title=title).mark_line(strokeWidth=line_width).encode(
+        x='Time Step:Q',
+        y='Count:Q',
+        color=alt.Color(
+            'State:N',
+            sort=list(STATE_COLORS),
+            scale=alt.Scale(domain=list(STATE_COLORS), range=list(STATE_COLORS.values()))
+        ),
+        strokeDash=alt.condition(alt.datum.State == 'Arrested', alt.value([6, 4]), alt.value([1, 0]))
+    )
+
+
+def population_chart(time_steps, active_counts, support_counts, oppose_counts, jail_counts, title, line_width=2):
+    """
+    Line chart of the population state counts, rendered in the browser.
+    """
+    time_steps, active_counts, support_counts, oppose_counts, jail_counts = decimate(
+        time_steps, active_counts, support_counts, oppose_counts, jail_counts
+    )
+    data = pd.DataFrame({
+        'Time Step': time_steps,
+        'Active Protesters': active_counts,
+        'Supporters': support_counts,
+        'Opponents': oppose_counts,
+        'Arrested': jail_counts
+    }).melt('Time Step', var_name='State', value_name='Count')
+    
+    return population_template(title, line_width).properties(data=data)
+
+
+@st.cache_resource(show_spinner=False)
+def participation_template(title, line_width):
+    """
+    Layers of the participation chart without the series data, built once
+    per title like population_template.
+    """
+    alt = altair_module()
+    base = alt.Chart().encode(x='Time Step:Q', y='Participation Rate (%):Q')
+    critical_line = alt.Chart(pd.DataFrame({'Critical': [5]})).mark_rule(
+        color='red', strokeDash=[6, 4], opacity=0.5
+    ).encode(y='Critical:Q')
+    
+    return alt.layer(
+        base.mark_area(color='#FE6100', opacity=0.3),
+        base.mark_line(color='#FE6100', strokeWidth=line_width),
+        critical_line,
+        title=title
+    )
+
+
+def participation_chart(time_steps, participation_rate, title, line_width=2):
+    """
+    Area chart of the participation rate with the 5% critical line.
+    """
+    time_steps, participation_rate = decimate(time_steps, participation_rate)
+    data = pd.DataFrame({'Time Step': time_steps, 'Participation Rate (%)': participation_rate})
+    
+    return participation_template(title, line_width).properties(data=data)
+
+
+# Point colors of the run outcomes
+OUTCOME_COLORS = {
+    'Revolution Success': 'green',
+    'Revolution Failed': 'red'
+}
+
+
+def history_scatter(history, param_to_analyze):
+    """
+    Scatter chart of the peak participation of the saved runs against one
+    parameter, rendered in the browser.
+    """
+    data = pd.DataFrame({
+        param_to_analyze: history[PARAM_KEYS[param_to_analyze]],
+        'Peak Participation Rate (%)': history['max_participation'],
+        'Outcome': np.where(history['revolution'], *OUTCOME_COLORS)
+    })
+    
+    alt = altair_module()
+    return alt.Chart(data, title=f'Impact of {param_to_analyze} on Participation').mark_circle(
+        size=100, opacity=0.6
+    ).encode(
+        x=alt.X(f'{param_to_analyze}:Q', scale=alt.Scale(zero=False)),
+        y='Peak Participation Rate (%):Q',
+        color=alt.Color(
+            'Outcome:N',
+            scale=alt.Scale(domain=list(OUTCOME_COLORS), range=list(OUTCOME_COLORS.values()))
+        )
+    )
+
+
+@st.cache_resource(show_spinner="Preparing the simulation engine...")
+def warm_up_model():
+    """
+    Build and step a small model once per server process, so the Numba
+    kernels are compiled, or loaded from their disk cache, before the first
+    real run instead of inside it.
+    """
+    model_class()(width=20, height=20, max_iters=1).step()
+
 
 # Page configuration
 st.set_page_config(
@@ -52,79 +342,85 @@ This model demonstrates how protest activities spread through populations. Adjus
 # Sidebar - Parameter settings
 st.sidebar.header("⚙️ Model Parameters")
 
-# Basic parameters
-st.sidebar.subheader("Basic Settings")
+# The inputs sit in a form, so adjusting them does not rerun the script.
+# Starting the run submits the form, so a run always uses the settings on
+# screen
+with st.sidebar.form("params"):
+    # Basic parameters
+    st.subheader("Basic Settings")
+
+    # Use columns for side-by-side display
+    col1, col2 = st.columns(2)
+
+    with col1:
+        width = st.number_input("Grid Width", min_value=20, max_value=100, value=40, step=10)
+        citizen_density = st.slider("Citizen Density", 0.1, 0.9, 0.7, 0.05)
+        seed = st.number_input("Random Seed", min_value=0, max_value=99999, value=42)
 
-# Use columns for side-by-side display
-col1, col2 = st.sidebar.columns(2)
+    with col2:
+        height = st.number_input("Grid Height", min_value=20, max_value=100, value=40, step=10)
+        max_iters = st.slider("Max Steps", 100, 1000, 500, 50)
 
-with col1:
-    width = st.number_input("Grid Width", min_value=20, max_value=100, value=40, step=10)
-    citizen_density = st.slider("Citizen Density", 0.1, 0.9, 0.7, 0.05)
-    seed = st.number_input("Random Seed", min_value=0, max_value=99999, value=42)
+    # Visualization settings
+    st.subheader("🎬 Visualization Settings")
+    update_frequency = st.slider(
+        "Update Frequency (every N steps)", 
+        min_value=1, 
+        max_value=20, 
+        value=5, 
+        step=1,
+        help="Lower values update more frequently but may slow down the simulation"
+    )
 
-with col2:
-    height = st.number_input("Grid Height", min_value=20, max_value=100, value=40, step=10)
-    max_iters = st.slider("Max Steps", 100, 1000, 500, 50)
-    
-# Visualization settings
-st.sidebar.subheader("🎬 Visualization Settings")
-update_frequency = st.sidebar.slider(
-    "Update Frequency (every N steps)", 
-    min_value=1, 
-    max_value=20, 
-    value=5, 
-    step=1,
-    help="Lower values update more frequently but may slow down the simulation"
-)
+    animation_speed = st.slider(
+        "Animation Speed",
+        min_value=0.0,
+        max_value=0.5,
+        value=0.01,
+        step=0.01,
+        help="Delay between steps (seconds). 0 = fastest"
+    )
 
-animation_speed = st.sidebar.slider(
-    "Animation Speed",
-    min_value=0.0,
-    max_value=0.5,
-    value=0.01,
-    step=0.01,
-    help="Delay between steps (seconds). 0 = fastest"
-)
+    # Key parameters
+    st.subheader("🎯 Key Parameters")
 
-# Key parameters
-st.sidebar.subheader("🎯 Key Parameters")
+    epsilon = st.slider(
+        "Information Uncertainty (ε)", 
+        min_value=0.1, 
+        max_value=1.5, 
+        value=0.5, 
+        step=0.1,
+        help="Degree of misjudgment about the actual situation. Higher values mean less accurate information."
+    )
 
-epsilon = st.sidebar.slider(
-    "Information Uncertainty (ε)", 
-    min_value=0.1, 
-    max_value=1.5, 
-    value=0.5, 
-    step=0.1,
-    help="Degree of misjudgment about the actual situation. Higher values mean less accurate information."
-)
+    security_density = st.slider(
+        "Security Force Density", 
+        min_value=0.0, 
+        max_value=0.1, 
+        value=0.02, 
+        step=0.01,
+        help="Proportion of police/security forces in the population."
+    )
 
-security_density = st.sidebar.slider(
-    "Security Force Density", 
-    min_value=0.0, 
-    max_value=0.1, 
-    value=0.02, 
-    step=0.01,
-    help="Proportion of police/security forces in the population."
-)
+    pp_mean = st.slider(
+        "Private Preference Mean", 
+        min_value=-1.0, 
+        max_value=0.0, 
+        value=-0.5, 
+        step=0.1,
+        help="On average, do people support (-1) or oppose (0) the regime internally."
+    )
 
-pp_mean = st.sidebar.slider(
-    "Private Preference Mean", 
-    min_value=-1.0, 
-    max_value=0.0, 
-    value=-0.5, 
-    step=0.1,
-    help="On average, do people support (-1) or oppose (0) the regime internally."
-)
+    threshold = st.slider(
+        "Activation Threshold", 
+        min_value=2.0, 
+        max_value=5.0, 
+        value=3.5, 
+        step=0.1,
+        help="Level of encouragement needed for people to participate in protests."
+    )
 
-threshold = st.sidebar.slider(
-    "Activation Threshold", 
-    min_value=2.0, 
-    max_value=5.0, 
-    value=3.5, 
-    step=0.1,
-    help="Level of encouragement needed for people to participate in protests."
-)
+    run_button = st.form_submit_button("🚀 Start Simulation", type="primary", use_container_width=True)
 
 # Parameter explanations
 with st.sidebar.expander("❓ Parameter Guide"):
@@ -135,223 +431,244 @@ with st.sidebar.expander("❓ Parameter Guide"):
     - **Activation Threshold**: Psychological barrier to participation
     """)
 
+# Compile the model kernels before any run starts
+warm_up_model()
+
 # Main interface layout
 tab1, tab2, tab3 = st.tabs(["🚀 Run Simulation", "📊 History", "📖 Model Guide"])
 
 with tab1:
-    # Run button
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col2:
-        run_button = st.button("🚀 Start Simulation", type="primary", use_container_width=True)
+    # The run starts from the parameter form in the sidebar
+    if not run_button:
+        st.info("Set the parameters in the sidebar, then press 🚀 Start Simulation.")
     
     if run_button:
-        # Create placeholders
-        status_placeholder = st.empty()
-        progress_bar = st.progress(0)
-        
-        # Create real-time chart placeholders
-        chart_placeholder = st.empty()
-        metrics_placeholder = st.empty()
-        
-        # Run model
-        status_placeholder.info("🔄 Initializing model...")
-        
-        # Create model instance
-        model = ResistanceCascade(
-            width=width,
-            height=height,
-            citizen_density=citizen_density,
-            security_density=security_density,
-            epsilon=epsilon,
-            private_preference_distribution_mean=pp_mean,
-            threshold=threshold,
-            seed=seed,
-            max_iters=max_iters,
-            multiple_agents_per_cell=True
+        # Runs with identical settings share one cached result
+        run_key = (
+            width, height, citizen_density, security_density,
+            epsilon, pp_mean, threshold, seed, max_iters
         )
+        result = cached_run(*run_key)
         
-        # Collect data
-        time_steps = []
-        active_counts = []
-        support_counts = []
-        oppose_counts = []
-        jail_counts = []
-        
-        # Run simulation
-        start_time = time.time()
-        step = 0
-        
-        # Create initial chart
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+        # Create placeholders
+        status_placeholder = st.empty()
         
-        while model.running and step < max_iters:
-            model.step()
+        if not result:
+            # Progress and status share one element, so an update is one message
+            progress_bar = st.progress(0, text="🔄 Initializing model...")
             
-            # Record data
-            time_steps.append(step)
-            active_counts.append(model.active_count)
-            support_counts.append(model.support_count)
-            oppose_counts.append(model.oppose_count)
-            jail_counts.append(model.count_jail(model))
+            # Create real-time chart columns and placeholders
+            live_charts = st.empty()
+            chart_col1, chart_col2 = live_charts.container().columns(2)
+            col1, col2, col3, col4 = st.columns(4)
+            step_metric, participation_metric, peak_metric, arrested_metric = (
+                col1.empty(), col2.empty(), col3.empty(), col4.empty()
+            )
+            live_population = live_participation = None
+            streamed = 0
+            # Peak of the run, kept up to date as batches come in
+            peak_active, peak_step = 0, 0
             
-            # Update progress
-            progress = (step + 1) / max_iters
-            progress_bar.progress(progress)
+            # Create model instance
+            model = model_class()(
+                width=width,
+                height=height,
+                citizen_density=citizen_density,
+                security_density=security_density,
+                epsilon=epsilon,
+                private_preference_distribution_mean=pp_mean,
+                threshold=threshold,
+                seed=seed,
+                max_iters=max_iters,
+                multiple_agents_per_cell=True,
+                # the app reads the counts only, agent rows are kept for the
+                # first and last step
+                collect_every=max_iters + 1
+            )
             
-            # Real-time chart update (every N steps)
-            if step % update_frequency == 0 or step == max_iters - 1:
-                # Clear old charts
-                ax1.clear()
-                ax2.clear()
-                
-                # Left chart: Population state changes
-                ax1.plot(time_steps, active_counts, label='Active Protesters', color='#FE6100', linewidth=2)
-                ax1.plot(time_steps, support_counts, label='Supporters', color='#648FFF', linewidth=2)
-                ax1.plot(time_steps, oppose_counts, label='Opponents', color='#A020F0', linewidth=2)
-                ax1.plot(time_steps, jail_counts, label='Arrested', color='#000000', linewidth=2, linestyle='--')
-                
-                ax1.set_xlabel('Time Step', fontsize=10)
-                ax1.set_ylabel('Count', fontsize=10)
-                ax1.set_title('Population State Evolution (Real-time)', fontsize=12, fontweight='bold')
-                ax1.legend(loc='best', fontsize=9)
-                ax1.grid(True, alpha=0.3)
+            # Collect data into a preallocated array, one row per step and
+            # one column per state. The sidebar caps the grid at 100x100 and
+            # the run at 1000 steps, so every value fits in int16
+            time_steps = np.arange(max_iters, dtype=np.int16)
+            counts = np.empty((max_iters, 4), dtype=np.int16)
+            active_counts, support_counts, oppose_counts, jail_counts = counts.T
+            
+            # Run simulation
+            start_time = time.time()
+            frame_end = time.perf_counter()
+            step = -1
+            
+            # Progress and status are sent at most ~20 times per run
+            update_every = max(1, max_iters // 20)
+            next_progress = 0
+            status_template = f"🔄 Simulation in progress... Step {{}}/{max_iters}"
+            
+            # Percent of the population per person, 0 for an empty population
+            participation_scale = 100.0 / model.citizen_count if model.citizen_count > 0 else 0.0
+            
+            # Batches of update_frequency steps run without widget calls, the
+            # loop body draws once at the end of each batch
+            for step, last_step in run_steps(model, max_iters, counts, update_frequency):
+                # Update progress and status
+                if step >= next_progress or last_step:
+                    progress = (step + 1) / max_iters
+                    progress_bar.progress(progress, text=status_template.format(step))
+                    next_progress = step + update_every
                 
-                # Right chart: Participation rate changes
-                participation_rate = [a / model.citizen_count * 100 for a in active_counts]
-                ax2.fill_between(time_steps, participation_rate, alpha=0.3, color='#FE6100')
-                ax2.plot(time_steps, participation_rate, color='#FE6100', linewidth=2)
-                ax2.axhline(y=5, color='red', linestyle='--', alpha=0.5, label='5% Critical Line')
+                # Real-time chart update at the end of the batch, only the
+                # steps since the last update are sent
+                n = step + 1
+                new_steps = slice(streamed, n)
+                population_rows = pd.DataFrame({
+                    'Time Step': time_steps[new_steps],
+                    'Active Protesters': active_counts[new_steps],
+                    'Supporters': support_counts[new_steps],
+                    'Opponents': oppose_counts[new_steps],
+                    'Arrested': jail_counts[new_steps]
+                })
+                participation_rows = pd.DataFrame({
+                    'Time Step': time_steps[new_steps],
+                    'Participation Rate (%)': active_counts[new_steps] * participation_scale
+                })
+                streamed = n
                 
-                ax2.set_xlabel('Time Step', fontsize=10)
-                ax2.set_ylabel('Participation Rate (%)', fontsize=10)
-                ax2.set_title('Protest Participation Rate (Real-time)', fontsize=12, fontweight='bold')
-                ax2.legend(fontsize=9)
-                ax2.grid(True, alpha=0.3)
+                # Update charts, the browser appends the rows to its data
+                if live_population is None:
+                    with chart_col1:
+                        st.caption('Population State Evolution (Real-time)')
+                        live_population = st.line_chart(
+                            population_rows, x='Time Step', y=list(STATE_COLORS),
+                            color=list(STATE_COLORS.values())
+                        )
+                    with chart_col2:
+                        st.caption('Protest Participation Rate (Real-time)')
+                        live_participation = st.area_chart(
+                            participation_rows, x='Time Step', color='#FE6100'
+                        )
+                else:
+                    live_population.add_rows(population_rows)
+                    live_participation.add_rows(participation_rows)
                 
-                plt.tight_layout()
+                # Update real-time metrics from the counts recorded this step,
+                # only the values change, the columns stay in place
+                step_metric.metric("Current Step", f"{step}/{max_iters}")
                 
-                # Update chart
-                chart_placeholder.pyplot(fig)
+                current_participation = active_counts[step] * participation_scale
+                participation_metric.metric("Current Participation", f"{current_participation:.1f}%")
                 
-                # Update real-time metrics
-                with metrics_placeholder.container():
-                    col1, col2, col3, col4 = st.columns(4)
-                    
-                    with col1:
-                        st.metric("Current Step", f"{step}/{max_iters}")
-                    
-                    with col2:
-                        current_participation = (model.active_count / model.citizen_count * 100) if model.citizen_count > 0 else 0
-                        st.metric("Current Participation", f"{current_participation:.1f}%")
-                    
-                    with col3:
-                        max_so_far = max(active_counts) if active_counts else 0
-                        st.metric("Peak So Far", f"{max_so_far} people")
-                    
-                    with col4:
-                        st.metric("Arrested", f"{model.count_jail(model)} people")
+                batch_peak = new_steps.start + int(active_counts[new_steps].argmax())
+                if active_counts[batch_peak] > peak_active:
+                    peak_active, peak_step = int(active_counts[batch_peak]), batch_peak
+                peak_metric.metric("Peak So Far", f"{peak_active} people")
                 
-                # Update status
-                status_placeholder.info(f"🔄 Simulation in progress... Step {step}/{max_iters}")
+                arrested_metric.metric("Arrested", f"{jail_counts[step]} people")
                 
-                # Add delay for animation observation
+                # Add delay for animation observation, less the time the
+                # batch and its redraw already took
                 if animation_speed > 0:
-                    time.sleep(animation_speed)
-            
-            step += 1
-        
-        # Close chart object
-        plt.close(fig)
-        
-        # Simulation complete
-        simulation_time = time.time() - start_time
-        status_placeholder.success(f"✅ Simulation complete! Completed in {simulation_time:.2f} seconds, {step} steps total")
-        progress_bar.empty()
+                    remaining = animation_speed - (time.perf_counter() - frame_end)
+                    if remaining > 0:
+                        time.sleep(remaining)
+                frame_end = time.perf_counter()
         
+            # Number of steps run
+            step += 1
+            
+            # Simulation complete
+            simulation_time = time.time() - start_time
+            status_placeholder.success(f"✅ Simulation complete! Completed in {simulation_time:.2f} seconds, {step} steps total")
+            progress_bar.empty()
+            
+            # The complete charts below replace the real-time ones
+            live_charts.empty()
+
+            # Save the finished run for identical settings
+            result.update({
+                'time_steps': time_steps[:step],
+                'active_counts': active_counts[:step],
+                'support_counts': support_counts[:step],
+                'oppose_counts': oppose_counts[:step],
+                'jail_counts': jail_counts[:step],
+                'revolution': model.revolution,
+                'citizen_count': model.citizen_count,
+                'final_active': model.active_count,
+                'peak_active': peak_active,
+                'peak_step': peak_step,
+                'steps': step
+            })
+        else:
+            status_placeholder.success(f"✅ Loaded saved results for these settings, {result['steps']} steps total")
+
+        time_steps = result['time_steps']
+        active_counts = result['active_counts']
+        support_counts = result['support_counts']
+        oppose_counts = result['oppose_counts']
+        jail_counts = result['jail_counts']
+        revolution = result['revolution']
+        citizen_count = result['citizen_count']
+        final_active = result['final_active']
+        # Peak of the run, shared by the metrics and the history
+        peak_active = result['peak_active']
+        peak_step = result['peak_step']
+
         # Display final results
         st.subheader("📊 Final Results")
         
-        # Key metrics
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.metric(
-                "Revolution Occurred", 
-                "Yes ✅" if model.revolution else "No ❌",
-                delta="Success" if model.revolution else "Failed"
-            )
-        
-        with col2:
-            max_participation = max(active_counts) / model.citizen_count * 100 if model.citizen_count > 0 else 0
-            st.metric(
-                "Peak Participation", 
-                f"{max_participation:.1f}%",
-                delta=f"{max_participation - 5:.1f}%" if max_participation > 5 else None
-            )
-        
-        with col3:
-            peak_step = active_counts.index(max(active_counts)) if active_counts else 0
-            st.metric(
-                "Time to Peak", 
-                f"Step {peak_step}",
-                delta="Fast" if peak_step < 50 else "Slow"
-            )
-        
-        with col4:
-            st.metric(
-                "Final Active Count", 
-                f"{model.active_count} people",
-                delta=f"{model.active_count - model.citizen_count * 0.1:.0f}"
-            )
+        # Percent of the population per person, 0 for an empty population
+        participation_scale = 100.0 / citizen_count if citizen_count > 0 else 0.0
+        
+        # Key metrics, one label, value and delta per column
+        max_participation = peak_active * participation_scale
+        final_metrics = [
+            ("Revolution Occurred", "Yes ✅" if revolution else "No ❌",
+             "Success" if revolution else "Failed"),
+            ("Peak Participation", f"{max_participation:.1f}%",
+             f"{max_participation - 5:.1f}%" if max_participation > 5 else None),
+            ("Time to Peak", f"Step {peak_step}",
+             "Fast" if peak_step < 50 else "Slow"),
+            ("Final Active Count", f"{final_active} people",
+             f"{final_active - citizen_count * 0.1:.0f}")
+        ]
+        for col, (label, value, delta) in zip(st.columns(4), final_metrics):
+            col.metric(label, value, delta=delta)
         
         # Redraw final chart (higher quality)
         st.subheader("📈 Complete Evolution Process")
         
-        final_fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 7))
-        
-        # Left chart: Population state changes
-        ax1.plot(time_steps, active_counts, label='Active Protesters', color='#FE6100', linewidth=2.5)
-        ax1.plot(time_steps, support_counts, label='Supporters', color='#648FFF', linewidth=2.5)
-        ax1.plot(time_steps, oppose_counts, label='Opponents', color='#A020F0', linewidth=2.5)
-        ax1.plot(time_steps, jail_counts, label='Arrested', color='#000000', linewidth=2.5, linestyle='--')
-        
-        ax1.set_xlabel('Time Step', fontsize=12)
-        ax1.set_ylabel('Count', fontsize=12)
-        ax1.set_title('Population State Evolution', fontsize=14, fontweight='bold')
-        ax1.legend(loc='best', fontsize=11)
-        ax1.grid(True, alpha=0.3)
-        
-        # Right chart: Participation rate changes
-        participation_rate = [a / model.citizen_count * 100 for a in active_counts]
-        ax2.fill_between(time_steps, participation_rate, alpha=0.3, color='#FE6100')
-        ax2.plot(time_steps, participation_rate, color='#FE6100', linewidth=2.5)
-        ax2.axhline(y=5, color='red', linestyle='--', alpha=0.5, label='5% Critical Line', linewidth=2)
+        participation_rate = active_counts * participation_scale
         
-        ax2.set_xlabel('Time Step', fontsize=12)
-        ax2.set_ylabel('Participation Rate (%)', fontsize=12)
-        ax2.set_title('Protest Participation Rate', fontsize=14, fontweight='bold')
-        ax2.legend(fontsize=11)
-        ax2.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        st.pyplot(final_fig)
-        plt.close(final_fig)
+        chart_col1, chart_col2 = st.columns(2)
+        with chart_col1:
+            st.altair_chart(population_chart(
+                time_steps, active_counts, support_counts, oppose_counts, jail_counts,
+                'Population State Evolution', line_width=2.5
+            ), use_container_width=True)
+        with chart_col2:
+            st.altair_chart(participation_chart(
+                time_steps, participation_rate, 'Protest Participation Rate', line_width=2.5
+            ), use_container_width=True)
         
         # Data table
         with st.expander("📊 View Detailed Data"):
-            # Create dataframe
-            df = pd.DataFrame({
-                'Time Step': time_steps[::10],  # Show every 10th step
+            # Show every 10th step
+            table = {
+                'Time Step': time_steps[::10],
                 'Active': active_counts[::10],
                 'Supporters': support_counts[::10],
                 'Opponents': oppose_counts[::10],
                 'Arrested': jail_counts[::10],
-                'Participation (%)': [f"{x:.1f}" for x in participation_rate[::10]]
-            })
-            st.dataframe(df, use_container_width=True)
+                'Participation (%)': participation_rate[::10]
+            }
+            
+            # Create dataframe, the rate stays numeric and is shown to one decimal
+            df = pd.DataFrame(table)
+            st.dataframe(
+                df, use_container_width=True,
+                column_config={'Participation (%)': st.column_config.NumberColumn(format="%.1f")}
+            )
             
             # Download button
-            csv = df.to_csv(index=False)
+            csv = results_csv(run_key, table)
             st.download_button(
                 label="📥 Download Data (CSV)",
                 data=csv,
@@ -359,91 +676,53 @@ with tab1:
                 mime="text/csv"
             )
         
-        # Save to session state
+        # Save to session state, one value per history column
         if 'history' not in st.session_state:
-            st.session_state.history = []
+            st.session_state.history = empty_history()
         
-        st.session_state.history.append({
+        record = {
             'timestamp': datetime.now(),
-            'params': {
-                'epsilon': epsilon,
-                'security_density': security_density,
-                'pp_mean': pp_mean,
-                'threshold': threshold
-            },
-            'results': {
-                'revolution': model.revolution,
-                'max_participation': max_participation,
-                'peak_time': peak_step,
-                'final_active': model.active_count
-            }
-        })
+            'epsilon': epsilon,
+            'security_density': security_density,
+            'pp_mean': pp_mean,
+            'threshold': threshold,
+            'revolution': revolution,
+            'max_participation': max_participation,
+            'peak_time': peak_step,
+            'final_active': final_active
+        }
+        for column, value in record.items():
+            st.session_state.history[column].append(value)
 
 with tab2:
     st.subheader("📊 Simulation History")
     
-    if 'history' in st.session_state and st.session_state.history:
-        # Convert to dataframe
-        history_data = []
-        for h in st.session_state.history:
-            record = {
-                'Time': h['timestamp'].strftime('%H:%M:%S'),
-                'ε': h['params']['epsilon'],
-                'Security': h['params']['security_density'],
-                'Preference': h['params']['pp_mean'],
-                'Threshold': h['params']['threshold'],
-                'Revolution': '✅' if h['results']['revolution'] else '❌',
-                'Peak Rate': f"{h['results']['max_participation']:.1f}%",
-                'Peak Time': h['results']['peak_time']
-            }
-            history_data.append(record)
-        
-        history_df = pd.DataFrame(history_data)
+    if 'history' in st.session_state and st.session_state.history['timestamp']:
+        # Convert to dataframe, rebuilt only when a run was added
+        history = st.session_state.history
+        run_count = len(history['timestamp'])
+        history_df = history_table(run_count, history['timestamp'][-1], history)
+        
+        # Long sessions show the latest runs unless asked for all of them
+        if run_count > HISTORY_ROWS and not st.checkbox("Show all runs", key="show_all_runs"):
+            history_df = history_df.tail(HISTORY_ROWS)
         st.dataframe(history_df, use_container_width=True)
         
         # Parameter comparison chart
-        if len(history_data) > 1:
+        if run_count > 1:
             st.subheader("📈 Parameter Impact Analysis")
             
             # Select parameter to analyze
             param_to_analyze = st.selectbox(
                 "Select parameter to analyze",
-                ['ε', 'Security', 'Preference', 'Threshold']
+                list(PARAM_KEYS)
             )
             
-            # Create scatter plot
-            fig, ax = plt.subplots(figsize=(10, 6))
-            
-            x_data = [h['params']['epsilon'] if param_to_analyze == 'ε' 
-                     else h['params']['security_density'] if param_to_analyze == 'Security'
-                     else h['params']['pp_mean'] if param_to_analyze == 'Preference'
-                     else h['params']['threshold'] 
-                     for h in st.session_state.history]
-            
-            y_data = [h['results']['max_participation'] for h in st.session_state.history]
-            colors = ['green' if h['results']['revolution'] else 'red' 
-                     for h in st.session_state.history]
-            
-            scatter = ax.scatter(x_data, y_data, c=colors, s=100, alpha=0.6)
-            ax.set_xlabel(param_to_analyze, fontsize=12)
-            ax.set_ylabel('Peak Participation Rate (%)', fontsize=12)
-            ax.set_title(f'Impact of {param_to_analyze} on Participation', fontsize=14, fontweight='bold')
-            ax.grid(True, alpha=0.3)
-            
-            # Add legend
-            green_patch = plt.Line2D([0], [0], marker='o', color='w', 
-                                   markerfacecolor='g', markersize=10, label='Revolution Success')
-            red_patch = plt.Line2D([0], [0], marker='o', color='w', 
-                                 markerfacecolor='r', markersize=10, label='Revolution Failed')
-            ax.legend(handles=[green_patch, red_patch], fontsize=10)
-            
-            st.pyplot(fig)
-            plt.close(fig)
+            # Create scatter plot, drawn client side
+            st.altair_chart(history_scatter(history, param_to_analyze), use_container_width=True)
         
         # Clear history button
-        if st.button("🗑️ Clear History"):
-            st.session_state.history = []
-            st.rerun()
+        st.button("🗑️ Clear History", on_click=clear_history)
     else:
         st.info("No simulation history yet. Run some simulations to see historical data here.")
 